@@ -12,12 +12,15 @@ Purpose: Demo tool for AI consistency testing
 import streamlit as st
 import pandas as pd
 import os
+import bisect
+import hashlib
 from dotenv import load_dotenv
 
 # Import our custom modules
-from prompts import SCENARIOS, SCENARIO_NAMES, get_scenario_prompt
+from prompts import SCENARIOS, SCENARIO_NAMES
 from validator import (
     run_business_case,
+    clear_cache,
     calculate_consistency_score,
     generate_comparison_table
 )
@@ -26,6 +29,34 @@ from demo_data import DEMO_RESULTS
 # Load environment variables
 load_dotenv()
 
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "styles.css")
+
+
+def hash_results(results: list) -> str:
+    """
+    Cache key for a results list.
+    
+    Hashes each run's number, text and metrics in one streaming digest,
+    instead of letting st.cache_data pickle the whole list first.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for result in results:
+        digest.update(
+            f"{result['run_number']}\0{result['response_text']}\0{result['metrics']!r}\0".encode("utf-8")
+        )
+    return digest.hexdigest()
+
+
+# Scoring and table building are pure functions of `results`, so cache them:
+# Streamlit reruns (slider nudges, expander toggles) on the same results then
+# skip the work entirely
+calculate_consistency_score = st.cache_data(
+    show_spinner=False, hash_funcs={list: hash_results}
+)(calculate_consistency_score)
+generate_comparison_table = st.cache_data(
+    show_spinner=False, hash_funcs={list: hash_results}
+)(generate_comparison_table)
+
 # =============================================================================
 # PAGE CONFIGURATION
 # =============================================================================
@@ -38,152 +69,125 @@ st.set_page_config(
 )
 
 # Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: #1f77b4;
-        margin-bottom: 0.5rem;
-    }
-    .score-box {
-        padding: 2rem;
-        border-radius: 10px;
-        text-align: center;
-        font-size: 2rem;
-        font-weight: bold;
-        margin: 2rem 0;
-    }
-    .score-production-ready {
-        background-color: #d4edda;
-        color: #155724;
-        border: 2px solid #c3e6cb;
-    }
-    .score-needs-tuning {
-        background-color: #fff3cd;
-        color: #856404;
-        border: 2px solid #ffeeba;
-    }
-    .score-needs-engineering {
-        background-color: #ffe5cc;
-        color: #cc5500;
-        border: 2px solid #ffd4a3;
-    }
-    .score-not-ready {
-        background-color: #f8d7da;
-        color: #721c24;
-        border: 2px solid #f5c6cb;
-    }
-    .metric-box {
-        padding: 1rem;
-        border-radius: 5px;
-        margin: 0.5rem 0;
-        background-color: #f8f9fa;
-    }
-    .findings-section {
-        background-color: #e7f3ff;
-        padding: 1.5rem;
-        border-radius: 8px;
-        border-left: 4px solid #1f77b4;
-        margin: 1rem 0;
-    }
-    .recommendation-section {
-        background-color: #f0f7ff;
-        padding: 1.5rem;
-        border-radius: 8px;
-        border-left: 4px solid #4a90e2;
-        margin: 1rem 0;
-    }
-    /* New styles for variance display */
-    .problem-header {
-        font-size: 1.8rem;
-        font-weight: 700;
-        color: #dc3545;
-        text-align: center;
-        margin: 1rem 0;
-    }
-    .problem-question {
-        font-size: 1.4rem;
-        font-weight: 600;
-        color: #333;
-        text-align: center;
-        margin: 1.5rem 0;
-        font-style: italic;
-    }
-    .variance-card {
-        padding: 1.5rem;
-        border-radius: 12px;
-        text-align: center;
-        margin: 0.5rem;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-    }
-    .variance-card-warning {
-        background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-    }
-    .variance-value {
-        font-size: 2.2rem;
-        font-weight: 800;
-        margin: 0.5rem 0;
-    }
-    .variance-label {
-        font-size: 0.9rem;
-        opacity: 0.9;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-    }
-    .variance-run {
-        font-size: 0.8rem;
-        opacity: 0.8;
-        margin-top: 0.3rem;
-    }
-    .trust-score-box {
-        padding: 2.5rem;
-        border-radius: 15px;
-        text-align: center;
-        margin: 2rem auto;
-        max-width: 500px;
-        box-shadow: 0 8px 30px rgba(0,0,0,0.12);
-    }
-    .trust-score-value {
-        font-size: 4rem;
-        font-weight: 800;
-        margin: 0.5rem 0;
-    }
-    .trust-score-label {
-        font-size: 1.1rem;
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 2px;
-    }
-    .trust-question {
-        font-size: 1.2rem;
-        margin-top: 1rem;
-        opacity: 0.9;
-    }
-    .demo-badge {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 0.3rem 1rem;
-        border-radius: 20px;
-        font-size: 0.8rem;
-        font-weight: 600;
-        display: inline-block;
-        margin-left: 1rem;
-    }
-    .warning-banner {
-        background: linear-gradient(135deg, #ff9a56 0%, #ff6b6b 100%);
-        color: white;
-        padding: 1rem 1.5rem;
-        border-radius: 10px;
-        text-align: center;
-        font-weight: 600;
-        margin: 1rem 0;
-        font-size: 1.1rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+# The stylesheet is read once per process; it still has to be emitted on every
+# rerun, since Streamlit drops any element a rerun doesn't re-create
+@st.cache_data(show_spinner=False)
+def load_css() -> str:
+    with open(CSS_PATH, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+
+st.markdown(load_css(), unsafe_allow_html=True)
+
+
+# Trust score styling: a score at or above TRUST_THRESHOLDS[i] gets
+# TRUST_STYLES[i + 1] as (background, label, question)
+TRUST_THRESHOLDS = (70, 85, 95)
+TRUST_STYLES = (
+    ("linear-gradient(135deg, #8E2DE2 0%, #4A00E0 100%)", "DON'T TRUST", "Do not use without review"),
+    ("linear-gradient(135deg, #eb3349 0%, #f45c43 100%)", "LOW TRUST", "Needs validation"),
+    ("linear-gradient(135deg, #F2994A 0%, #F2C94C 100%)", "MEDIUM TRUST", "Review before sending"),
+    ("linear-gradient(135deg, #11998e 0%, #38ef7d 100%)", "HIGH TRUST", "Safe to send to clients"),
+)
+
+
+def variance_cards_html(metric_name: str, values: list) -> str:
+    """Build one variance card per run as a single flex-row HTML block."""
+    cards = []
+    for i, val in enumerate(values):
+        # Alternate colors for visual impact
+        card_class = "variance-card" if i != 1 else "variance-card variance-card-warning"
+        cards.append(
+            f'<div class="{card_class}">'
+            f'<div class="variance-label">{metric_name}</div>'
+            f'<div class="variance-value">{val}</div>'
+            f'<div class="variance-run">Run #{i+1}</div>'
+            '</div>'
+        )
+    return f'<div class="variance-row">{"".join(cards)}</div>'
+
+
+def render_results_html(score_data: dict, key_variance: dict = None, live_variance: list = None) -> str:
+    """
+    Build the top of the results panel (the variance display and the trust
+    score) as one HTML string.
+    
+    Called once per test run; reruns just re-emit the stored string.
+    """
+    # =================================================================
+    # THE PROBLEM - Visual variance display (hero section)
+    # =================================================================
+
+    parts = [
+        '<hr>',
+        '<div class="problem-header">⚠️ THE PROBLEM: Same Prompt, Different Answers</div>'
+    ]
+
+    # Display the key metric that varies
+    if key_variance:
+        parts.append(f'<div class="warning-banner">{key_variance["problem_statement"]}</div>')
+        parts.append(variance_cards_html(key_variance['metric_name'], key_variance['values']))
+    elif live_variance:
+        # Live mode: first percentage (usually ROI) per run
+        parts.append(variance_cards_html("ROI", [f"{pct}%" for pct in live_variance]))
+
+    parts.append('<div class="problem-question">"Which number do you put in the client proposal?"</div>')
+    parts.append('<hr>')
+
+    # =================================================================
+    # TRUST SCORE (reframed from consistency score)
+    # =================================================================
+
+    score = score_data['total_score']
+
+    # Determine styling based on score
+    bg_color, trust_label, trust_question = TRUST_STYLES[bisect.bisect_right(TRUST_THRESHOLDS, score)]
+
+    parts.append(
+        f'<div class="trust-score-box" style="background: {bg_color}; color: white;">'
+        f'<div class="trust-score-label">{trust_label}</div>'
+        f'<div class="trust-score-value">{score}%</div>'
+        f'<div class="trust-question">{trust_question}</div>'
+        '</div>'
+    )
+    parts.append('<hr>')
+
+    return "\n".join(parts)
+
+
+def store_results(
+    scenario: str,
+    results: list,
+    score_data: dict,
+    key_variance: dict = None,
+    live_variance: list = None
+) -> None:
+    """
+    Save a finished test run in session state, along with everything the
+    results panel renders from it, so reruns don't rebuild any of it.
+    """
+    st.session_state['results'] = results
+    st.session_state['score_data'] = score_data
+    st.session_state['results_html'] = render_results_html(score_data, key_variance, live_variance)
+    # A small read-only table, so a static HTML table instead of an
+    # interactive st.dataframe grid
+    st.session_state['comparison_html'] = generate_comparison_table(results).to_html(
+        classes="comparison-table", border=0
+    )
+    st.session_state['findings_md'] = "\n".join(f"- {finding}" for finding in score_data['findings'])
+    # Native <details> collapsibles in one element instead of an expander per
+    # run; the blank lines let the responses still render as markdown. "<" in
+    # model output is escaped so any tags in it (e.g. a stray </details>) show
+    # as text instead of being rendered or breaking the collapsibles; ">" is
+    # left alone so markdown blockquotes still work.
+    st.session_state['responses_html'] = "".join(
+        f'<details class="response-details"><summary>📄 Run #{result["run_number"]}</summary>'
+        f'\n\n{result["response_text"].replace("<", "&lt;")}\n\n</details>\n\n'
+        for result in results
+    )
+    st.session_state['show_results'] = True
+    st.session_state['selected_scenario'] = scenario
+
 
 # =============================================================================
 # SIDEBAR CONFIGURATION
@@ -212,6 +216,17 @@ else:
         help="Enter your Anthropic API key. You can also set ANTHROPIC_API_KEY environment variable."
     )
 
+    # Result Cache
+    st.sidebar.subheader("💾 Result Cache")
+    use_cache = st.sidebar.checkbox(
+        "Reuse cached results",
+        value=True,
+        help="Reuse saved runs of the same scenario and temperature instead of calling the API again. Raising the number of runs only calls the API for the new ones."
+    )
+    if st.sidebar.button("Clear cache"):
+        removed = clear_cache()
+        st.sidebar.success(f"Removed {removed} cached result(s)")
+
 # Scenario Selection
 st.sidebar.subheader("📋 Business Case Scenario")
 selected_scenario = st.sidebar.selectbox(
@@ -288,12 +303,12 @@ st.header("📝 Selected Business Case")
 scenario_data = SCENARIOS[selected_scenario]
 
 # Show scenario description
-st.markdown(f"**Scenario:** {scenario_data['name']}")
-st.markdown(f"*{scenario_data['description']}*")
+st.markdown(f"**Scenario:** {scenario_data.name}")
+st.markdown(f"*{scenario_data.description}*")
 
 # Show the prompt in an expander
 with st.expander("👁️ View Full Prompt", expanded=False):
-    st.code(scenario_data['prompt'], language=None)
+    st.code(scenario_data.prompt, language=None)
 
 st.markdown("---")
 
@@ -312,14 +327,10 @@ if demo_mode:
         if demo_data:
             results = demo_data["results"]
             key_variance = demo_data["key_variance"]
-            score_data = calculate_consistency_score(results)
+            score_data = demo_data["score_data"]
 
             # Store in session state
-            st.session_state['results'] = results
-            st.session_state['score_data'] = score_data
-            st.session_state['key_variance'] = key_variance
-            st.session_state['show_results'] = True
-            st.session_state['selected_scenario'] = selected_scenario
+            store_results(selected_scenario, results, score_data, key_variance=key_variance)
 
 elif not api_key_input or api_key_input.strip() == "":
     st.warning("⚠️ Please enter your Anthropic API key in the sidebar to run the validation test.")
@@ -327,34 +338,53 @@ elif not api_key_input or api_key_input.strip() == "":
 else:
     # Live mode - call API
     if st.button("🚀 Run Validation Test", type="primary", use_container_width=True):
-        prompt = get_scenario_prompt(selected_scenario)
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        prompt = scenario_data.prompt
+
+        # Live previews: one column per run, filled in as text streams back.
+        # The columns are only laid out once text arrives, so a fully cached
+        # test never creates them.
+        preview_area = st.empty()
+        previews = []
+        streamed_text = [""] * num_runs
+
+        def show_partial_text(run_number: int, text: str) -> None:
+            if not previews:
+                with preview_area.container():
+                    for i, col in enumerate(st.columns(num_runs)):
+                        with col:
+                            st.caption(f"📄 Run #{i+1}")
+                            previews.append(st.empty())
+            streamed_text[run_number - 1] += text
+            previews[run_number - 1].markdown(streamed_text[run_number - 1])
 
         try:
-            status_text.text("🔄 Running validation test...")
-            results = run_business_case(
-                prompt=prompt,
-                api_key=api_key_input,
-                num_runs=num_runs,
-                temperature=temperature
-            )
-            progress_bar.progress(50)
-            status_text.text("📊 Analyzing results...")
-            score_data = calculate_consistency_score(results)
-            progress_bar.progress(100)
-            status_text.text("✅ Analysis complete!")
+            with st.spinner("🔄 Running validation test..."):
+                results = run_business_case(
+                    prompt=prompt,
+                    api_key=api_key_input,
+                    num_runs=num_runs,
+                    temperature=temperature,
+                    on_text=show_partial_text,
+                    use_cache=use_cache
+                )
+                score_data = calculate_consistency_score(results)
+
+                # For live mode, extract key variance from results
+                # Show ROI or first percentage that varies
+                live_variance = None
+                first_pcts = [r['metrics']['percentages'][0] for r in results if r['metrics']['percentages']]
+                if len(first_pcts) >= 2 and len(set(first_pcts)) > 1:  # Values differ
+                    live_variance = [
+                        r['metrics']['percentages'][0] if r['metrics']['percentages'] else 'N/A'
+                        for r in results
+                    ]
+            preview_area.empty()
 
             # Store in session state
-            st.session_state['results'] = results
-            st.session_state['score_data'] = score_data
-            st.session_state['key_variance'] = None
-            st.session_state['show_results'] = True
-            st.session_state['selected_scenario'] = selected_scenario
+            store_results(selected_scenario, results, score_data, live_variance=live_variance)
 
         except Exception as e:
-            progress_bar.empty()
-            status_text.empty()
+            preview_area.empty()
             st.error(f"❌ Error during validation: {str(e)}")
             st.exception(e)
 
@@ -363,97 +393,8 @@ else:
 # =============================================================================
 
 if st.session_state.get('show_results') and st.session_state.get('selected_scenario') == selected_scenario:
-    results = st.session_state['results']
-    score_data = st.session_state['score_data']
-    key_variance = st.session_state.get('key_variance')
-
-    st.markdown("---")
-
-    # =================================================================
-    # THE PROBLEM - Visual variance display (hero section)
-    # =================================================================
-
-    st.markdown('<div class="problem-header">⚠️ THE PROBLEM: Same Prompt, Different Answers</div>', unsafe_allow_html=True)
-
-    # Display the key metric that varies
-    if key_variance:
-        metric_name = key_variance['metric_name']
-        values = key_variance['values']
-        problem_statement = key_variance['problem_statement']
-
-        st.markdown(f'<div class="warning-banner">{problem_statement}</div>', unsafe_allow_html=True)
-
-        # Show the 3 different values side by side
-        cols = st.columns(3)
-        for i, (col, val) in enumerate(zip(cols, values)):
-            with col:
-                # Alternate colors for visual impact
-                card_class = "variance-card" if i != 1 else "variance-card variance-card-warning"
-                st.markdown(f'''
-                <div class="{card_class}">
-                    <div class="variance-label">{metric_name}</div>
-                    <div class="variance-value">{val}</div>
-                    <div class="variance-run">Run #{i+1}</div>
-                </div>
-                ''', unsafe_allow_html=True)
-    else:
-        # For live mode, extract key variance from results
-        # Show ROI or first percentage that varies
-        all_percentages = [r['metrics']['percentages'] for r in results if r['metrics']['percentages']]
-        if all_percentages and len(all_percentages) >= 2:
-            first_pcts = [p[0] for p in all_percentages if p]
-            if len(set(first_pcts)) > 1:  # Values differ
-                cols = st.columns(len(results))
-                for i, (col, result) in enumerate(zip(cols, results)):
-                    with col:
-                        pct = result['metrics']['percentages'][0] if result['metrics']['percentages'] else 'N/A'
-                        card_class = "variance-card" if i != 1 else "variance-card variance-card-warning"
-                        st.markdown(f'''
-                        <div class="{card_class}">
-                            <div class="variance-label">ROI</div>
-                            <div class="variance-value">{pct}%</div>
-                            <div class="variance-run">Run #{i+1}</div>
-                        </div>
-                        ''', unsafe_allow_html=True)
-
-    st.markdown('<div class="problem-question">"Which number do you put in the client proposal?"</div>', unsafe_allow_html=True)
-
-    st.markdown("---")
-
-    # =================================================================
-    # TRUST SCORE (reframed from consistency score)
-    # =================================================================
-
-    score = score_data['total_score']
-    status = score_data['status']
-
-    # Determine styling based on score
-    if score >= 95:
-        bg_color = "linear-gradient(135deg, #11998e 0%, #38ef7d 100%)"
-        trust_label = "HIGH TRUST"
-        trust_question = "Safe to send to clients"
-    elif score >= 85:
-        bg_color = "linear-gradient(135deg, #F2994A 0%, #F2C94C 100%)"
-        trust_label = "MEDIUM TRUST"
-        trust_question = "Review before sending"
-    elif score >= 70:
-        bg_color = "linear-gradient(135deg, #eb3349 0%, #f45c43 100%)"
-        trust_label = "LOW TRUST"
-        trust_question = "Needs validation"
-    else:
-        bg_color = "linear-gradient(135deg, #8E2DE2 0%, #4A00E0 100%)"
-        trust_label = "DON'T TRUST"
-        trust_question = "Do not use without review"
-
-    st.markdown(f'''
-    <div class="trust-score-box" style="background: {bg_color}; color: white;">
-        <div class="trust-score-label">{trust_label}</div>
-        <div class="trust-score-value">{score}%</div>
-        <div class="trust-question">{trust_question}</div>
-    </div>
-    ''', unsafe_allow_html=True)
-
-    st.markdown("---")
+    # Variance display and trust score, rendered once when the test ran
+    st.markdown(st.session_state['results_html'], unsafe_allow_html=True)
 
     # =================================================================
     # METRICS COMPARISON TABLE
@@ -462,14 +403,8 @@ if st.session_state.get('show_results') and st.session_state.get('selected_scena
     st.header("📊 Side-by-Side Comparison")
     st.markdown("*Look at how the numbers differ across runs:*")
 
-    comparison_df = generate_comparison_table(results)
-
-    # Display the comparison table with highlighting
-    st.dataframe(
-        comparison_df,
-        use_container_width=True,
-        height=350
-    )
+    # Built once when the test ran, not on every rerun
+    st.markdown(st.session_state['comparison_html'], unsafe_allow_html=True)
 
     st.markdown("---")
 
@@ -479,9 +414,8 @@ if st.session_state.get('show_results') and st.session_state.get('selected_scena
 
     st.header("🔍 What This Means")
 
-    if score_data['findings']:
-        for finding in score_data['findings']:
-            st.markdown(f"- {finding}")
+    if st.session_state['findings_md']:
+        st.markdown(st.session_state['findings_md'])
 
     # =================================================================
     # AI OUTPUTS (collapsed by default)
@@ -491,9 +425,7 @@ if st.session_state.get('show_results') and st.session_state.get('selected_scena
     st.header("🤖 Full AI Responses")
     st.markdown("*Expand to see what the AI actually generated:*")
 
-    for result in results:
-        with st.expander(f"📄 Run #{result['run_number']}", expanded=False):
-            st.markdown(result['response_text'])
+    st.markdown(st.session_state['responses_html'], unsafe_allow_html=True)
 
 # =============================================================================
 # FOOTER
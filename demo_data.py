@@ -5,6 +5,8 @@ These are realistic sample outputs that demonstrate the variance problem
 without needing to call the API during a live demo.
 """
 
+from validator import calculate_consistency_score
+
 DEMO_RESULTS = {
     "Cloud Migration ROI": {
         "results": [
@@ -366,3 +368,8 @@ Outstanding ROI of over 1000% with minimal payback period. Strongly recommend im
         }
     }
 }
+
+# The demo results never change, so score them once at import time instead of
+# on every "See The Problem" click
+for _scenario in DEMO_RESULTS.values():
+    _scenario["score_data"] = calculate_consistency_score(_scenario["results"])
@@ -11,15 +11,43 @@ Author: AI & Data Consultant
 Purpose: Demo tool for testing AI agent consistency
 """
 
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping
+
+
+# =============================================================================
+# SCENARIO DEFINITION
+# =============================================================================
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    """
+    A static business case scenario.
+    
+    Attributes:
+        name (str): Display name of the scenario
+        description (str): One-line summary shown under the scenario name
+        prompt (str): The full prompt sent to the AI on every run
+        expected_metrics (Mapping[str, Any]): Reference values for validation
+        tolerance (Mapping[str, float]): Percentage variance allowed per metric type
+    """
+    name: str
+    description: str
+    prompt: str
+    expected_metrics: Mapping[str, Any]
+    tolerance: Mapping[str, float]
+
+
 # =============================================================================
 # CLOUD MIGRATION ROI SCENARIO
 # =============================================================================
 
-CLOUD_MIGRATION_SCENARIO = {
-    "name": "Cloud Migration ROI Analysis",
-    "description": "Evaluate the financial case for migrating on-premise infrastructure to cloud",
+CLOUD_MIGRATION_SCENARIO = Scenario(
+    name="Cloud Migration ROI Analysis",
+    description="Evaluate the financial case for migrating on-premise infrastructure to cloud",
     
-    "prompt": """You are a financial analyst helping a company evaluate a cloud migration project.
+    prompt="""You are a financial analyst helping a company evaluate a cloud migration project.
 
 **COMPANY BACKGROUND:**
 - Mid-size manufacturing company
@@ -62,7 +90,7 @@ Provide your final recommendation with a brief justification (2-3 sentences).
 Format your response with clear sections and bold the key metrics.""",
 
     # Expected metrics for validation (approximate ranges acceptable)
-    "expected_metrics": {
+    expected_metrics=MappingProxyType({
         "current_cost": 4760000,
         "proposed_cost": 3100000,
         "annual_savings": 1660000,
@@ -71,26 +99,26 @@ Format your response with clear sections and bold the key metrics.""",
         "three_year_savings": 4300000,  # (1660000 * 3) - 680000
         "roi_percentage": 632,  # ((4980000 - 680000) / 680000) * 100
         "recommendation": "PROCEED"
-    },
+    }),
     
     # Tolerance levels for validation (percentage variance allowed)
-    "tolerance": {
+    tolerance=MappingProxyType({
         "dollar_amounts": 2.0,  # 2% variance acceptable
         "percentages": 5.0,      # 5% variance acceptable
         "time_periods": 10.0     # 10% variance acceptable for months
-    }
-}
+    })
+)
 
 
 # =============================================================================
 # WAREHOUSE AUTOMATION SCENARIO
 # =============================================================================
 
-WAREHOUSE_AUTOMATION_SCENARIO = {
-    "name": "Warehouse Automation Investment",
-    "description": "Assess the business case for implementing robotic automation in a distribution center",
+WAREHOUSE_AUTOMATION_SCENARIO = Scenario(
+    name="Warehouse Automation Investment",
+    description="Assess the business case for implementing robotic automation in a distribution center",
     
-    "prompt": """You are a financial analyst evaluating a warehouse automation project.
+    prompt="""You are a financial analyst evaluating a warehouse automation project.
 
 **COMPANY BACKGROUND:**
 - E-commerce distribution company
@@ -132,7 +160,7 @@ Provide your final recommendation with a brief justification (2-3 sentences).
 
 Format your response with clear sections and bold the key metrics.""",
 
-    "expected_metrics": {
+    expected_metrics=MappingProxyType({
         "current_cost": 10500000,
         "proposed_cost": 4140000,
         "annual_savings": 6360000,
@@ -141,25 +169,25 @@ Format your response with clear sections and bold the key metrics.""",
         "five_year_savings": 20800000,  # (6360000 * 5) - 11000000
         "roi_percentage": 189,  # ((31800000 - 11000000) / 11000000) * 100
         "recommendation": "PROCEED"
-    },
+    }),
     
-    "tolerance": {
+    tolerance=MappingProxyType({
         "dollar_amounts": 2.0,
         "percentages": 5.0,
         "time_periods": 10.0
-    }
-}
+    })
+)
 
 
 # =============================================================================
 # AI CHATBOT SCENARIO
 # =============================================================================
 
-AI_CHATBOT_SCENARIO = {
-    "name": "AI Customer Service Chatbot",
-    "description": "Evaluate implementing an AI chatbot to handle customer service inquiries",
+AI_CHATBOT_SCENARIO = Scenario(
+    name="AI Customer Service Chatbot",
+    description="Evaluate implementing an AI chatbot to handle customer service inquiries",
     
-    "prompt": """You are a financial analyst evaluating an AI chatbot implementation for customer service.
+    prompt="""You are a financial analyst evaluating an AI chatbot implementation for customer service.
 
 **COMPANY BACKGROUND:**
 - SaaS company with 50,000 active customers
@@ -209,7 +237,7 @@ Provide your final recommendation with a brief justification (2-3 sentences).
 
 Format your response with clear sections and bold the key metrics.""",
 
-    "expected_metrics": {
+    expected_metrics=MappingProxyType({
         "current_cost": 3600000,
         "proposed_cost": 2280000,
         "annual_savings": 1320000,
@@ -218,29 +246,30 @@ Format your response with clear sections and bold the key metrics.""",
         "three_year_savings": 3600000,  # (1320000 * 3) - 360000
         "roi_percentage": 1000,  # ((3960000 - 360000) / 360000) * 100
         "recommendation": "PROCEED"
-    },
+    }),
     
-    "tolerance": {
+    tolerance=MappingProxyType({
         "dollar_amounts": 2.0,
         "percentages": 5.0,
         "time_periods": 10.0
-    }
-}
+    })
+)
 
 
 # =============================================================================
 # SCENARIO REGISTRY
 # =============================================================================
 
-# Dictionary to easily access scenarios by name
-SCENARIOS = {
+# Read-only mapping to easily access scenarios by name. Scenarios are static
+# data shared by every app session, so callers get objects they can't mutate.
+SCENARIOS = MappingProxyType({
     "Cloud Migration ROI": CLOUD_MIGRATION_SCENARIO,
     "Warehouse Automation": WAREHOUSE_AUTOMATION_SCENARIO,
     "AI Customer Service Chatbot": AI_CHATBOT_SCENARIO
-}
+})
 
-# List of scenario names for UI dropdown
-SCENARIO_NAMES = list(SCENARIOS.keys())
+# Scenario names for UI dropdown
+SCENARIO_NAMES = tuple(SCENARIOS)
 
 
 # =============================================================================
@@ -255,7 +284,7 @@ def get_scenario(scenario_name):
         scenario_name (str): Name of the scenario to retrieve
         
     Returns:
-        dict: Scenario dictionary with prompt, expected_metrics, etc.
+        Scenario: Frozen scenario with prompt, expected_metrics, etc.
         
     Raises:
         KeyError: If scenario name not found
@@ -277,7 +306,7 @@ def get_scenario_prompt(scenario_name):
         str: The prompt text
     """
     scenario = get_scenario(scenario_name)
-    return scenario["prompt"]
+    return scenario.prompt
 
 
 def get_expected_metrics(scenario_name):
@@ -288,10 +317,10 @@ def get_expected_metrics(scenario_name):
         scenario_name (str): Name of the scenario
         
     Returns:
-        dict: Expected metrics and their values
+        Mapping: Read-only expected metrics and their values
     """
     scenario = get_scenario(scenario_name)
-    return scenario["expected_metrics"]
+    return scenario.expected_metrics
 
 
 # TODO: Add more scenarios as needed
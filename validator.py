@@ -11,30 +11,118 @@ Author: AI & Data Consultant
 Purpose: Test AI agent output consistency before production deployment
 """
 
+import os
 import re
+import queue
+import pickle
+import hashlib
+import asyncio
+import bisect
+import threading
 import anthropic
+from anthropic import AsyncAnthropic
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Tuple
-from statistics import mean, stdev
+from typing import List, Dict, Any, Tuple, Callable, Optional, TypedDict
+from math import fsum
+from statistics import stdev
+from functools import lru_cache
+from itertools import islice, zip_longest
+from operator import itemgetter
+
+
+# =============================================================================
+# RESULT TYPES
+# =============================================================================
+
+class Metrics(TypedDict):
+    """Metrics parsed from one AI response (see extract_metrics)."""
+    dollar_amounts: List[float]
+    percentages: List[float]
+    months: List[float]
+    recommendation: str
+    raw_recommendation_text: str
+
+
+class RunResult(TypedDict):
+    """One run of a business case (see run_business_case)."""
+    run_number: int
+    response_text: str
+    metrics: Metrics
 
 
 # =============================================================================
 # API INTERACTION
 # =============================================================================
 
+# All API calls run on one long-lived event loop in a background thread. An
+# AsyncAnthropic client's connection pool is tied to the loop that first used
+# it, so a shared loop is what lets the cached client be reused across
+# validation runs (asyncio.run would create and close a new loop every time).
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+_event_loop_lock = threading.Lock()
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop, starting it on first use."""
+    global _event_loop
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_event_loop.run_forever,
+                name="validator-event-loop",
+                daemon=True
+            ).start()
+    return _event_loop
+
+
+@lru_cache(maxsize=8)
+def _get_async_client(api_key: str) -> AsyncAnthropic:
+    """
+    Return the shared AsyncAnthropic client for an API key.
+    
+    Reusing the client keeps its connection pool (TLS sessions, keep-alive
+    connections) warm between validation runs. Only use it from coroutines
+    running on _get_event_loop().
+    """
+    return AsyncAnthropic(api_key=api_key)
+
+
 def run_business_case(
     prompt: str,
     api_key: str,
     num_runs: int = 3,
     model: str = "claude-sonnet-4-20250514",
     temperature: float = 1.0,
-    max_tokens: int = 4000
-) -> List[Dict[str, Any]]:
+    max_tokens: int = 4000,
+    on_text: Optional[Callable[[int, str], None]] = None,
+    use_cache: bool = False,
+    use_batch_api: bool = False
+) -> List[RunResult]:
     """
     Run the same business case prompt multiple times to test consistency.
     
     This is the main function that calls the Anthropic API. It runs the same
-    prompt multiple times and returns all responses for comparison.
+    prompt multiple times and returns all responses for comparison. The runs
+    are independent, so they are sent concurrently and the total wait is
+    roughly one API call instead of num_runs calls back to back.
+    
+    Responses are streamed. Pass on_text to see each run's text as it
+    arrives (e.g. to render partial responses) instead of only at the end.
+    
+    With use_cache=True, each run's result is saved to disk, keyed by the
+    prompt, model, temperature, max_tokens and run number. Runs that were
+    already saved are returned without calling the API (on_text is not
+    called for them), so repeating a request is free and raising num_runs
+    only pays for the new runs. If a run fails, the runs that had already
+    succeeded are still saved before the error is raised.
+    
+    With use_batch_api=True, the runs are submitted together through the
+    Message Batches API instead of as concurrent requests. Batches cost less
+    and are not subject to the per-minute rate limits, but Anthropic may take
+    minutes (up to 24 hours) to process them, so this suits large num_runs
+    sweeps rather than interactive use. Batched runs are not streamed.
     
     Args:
         prompt (str): The business case prompt to send to the AI
@@ -43,16 +131,22 @@ def run_business_case(
         model (str): Claude model to use (default: claude-sonnet-4-20250514)
         temperature (float): Temperature setting (default: 1.0)
         max_tokens (int): Maximum tokens in response (default: 4000)
+        on_text (Callable): Optional callback, called as on_text(run_number, text)
+            for each chunk of streamed text. Always called on the calling thread.
+        use_cache (bool): Reuse results saved by an identical earlier call
+            (default: False)
+        use_batch_api (bool): Submit the runs as one Message Batch
+            (default: False)
     
     Returns:
-        List[Dict]: List of results, each containing:
+        List[RunResult]: List of results (in run order), each containing:
             - run_number: Which run this was (1, 2, 3...)
             - response_text: The full AI response
             - metrics: Extracted metrics (populated by extract_metrics)
-            - raw_response: The full API response object
     
     Raises:
-        anthropic.APIError: If API calls fail
+        RuntimeError: If an API call fails (the anthropic.APIError is chained
+            as its cause), or a batched run errors, expires or is canceled
         ValueError: If api_key is invalid
     
     Example:
@@ -63,53 +157,363 @@ def run_business_case(
     if not api_key or api_key.strip() == "":
         raise ValueError("API key is required")
     
-    # Initialize the Anthropic client
-    client = anthropic.Anthropic(api_key=api_key)
+    # Work out which runs actually need an API call
+    results_by_run: Dict[int, RunResult] = {}
+    if use_cache:
+        for run_num in range(1, num_runs + 1):
+            cached = _load_cached_result(
+                _cache_path(prompt, model, temperature, max_tokens, run_num)
+            )
+            if cached is not None:
+                results_by_run[run_num] = cached
+    run_nums = [n for n in range(1, num_runs + 1) if n not in results_by_run]
+    if not run_nums:
+        return [results_by_run[n] for n in range(1, num_runs + 1)]
+    
+    # Streamed chunks are produced on the background loop and handed back
+    # through a queue, so on_text always runs on the calling thread
+    chunks: "queue.Queue[Tuple[int, str]]" = queue.Queue()
+    relay = None if on_text is None else (lambda run_num, text: chunks.put((run_num, text)))
+    
+    if use_batch_api:
+        coro = _run_batch(prompt, api_key, run_nums, model, temperature, max_tokens)
+    else:
+        coro = _run_all(prompt, api_key, run_nums, model, temperature, max_tokens, relay)
+    future = asyncio.run_coroutine_threadsafe(coro, _get_event_loop())
+    
+    try:
+        if on_text is not None:
+            while not (future.done() and chunks.empty()):
+                try:
+                    on_text(*chunks.get(timeout=0.05))
+                except queue.Empty:
+                    continue
+        new_results, error = future.result()
+    except BaseException:
+        # e.g. the caller was interrupted; don't leave the runs going
+        future.cancel()
+        raise
+    
+    # Save every run that succeeded, even if another one failed: they have
+    # been paid for, and a retry then only calls the API for the rest
+    if use_cache:
+        for result in new_results:
+            _store_cached_result(
+                _cache_path(prompt, model, temperature, max_tokens, result["run_number"]),
+                result
+            )
+    
+    if error is not None:
+        raise error
+    
+    # Merge fresh and saved runs back into run order
+    results_by_run.update((r["run_number"], r) for r in new_results)
+    return [results_by_run[n] for n in range(1, num_runs + 1)]
+
+
+async def _run_all(
+    prompt: str,
+    api_key: str,
+    run_nums: List[int],
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    on_text: Optional[Callable[[int, str], None]]
+) -> Tuple[List[RunResult], Optional[BaseException]]:
+    """
+    Send the given runs at once and wait for them together.
+    
+    Returns:
+        Tuple: (results of the runs that succeeded, in the order of run_nums;
+            the first failed run's exception, or None if all succeeded)
+    """
+    # Shared Anthropic client (reused by all concurrent runs and later calls)
+    client = _get_async_client(api_key)
+    
+    tasks = [
+        asyncio.ensure_future(
+            _one_run(client, prompt, run_num, model, temperature, max_tokens, on_text)
+        )
+        for run_num in run_nums
+    ]
+    try:
+        # Wait for every run, or stop early as soon as one fails
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # If a run failed (typically a 429 from sending all runs at once) or
+        # the caller gave up, stop the others: on the long-lived background
+        # loop they would otherwise keep streaming, billed, with their output
+        # thrown away. Cancelling a finished task does nothing.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    # Report the first failed run (in run order). Its siblings were cancelled
+    # because of it, so their CancelledError is not the error to surface.
+    finished = [task for task in tasks if not task.cancelled()]
+    errors = [task.exception() for task in finished if task.exception() is not None]
+    results = [task.result() for task in finished if task.exception() is None]
+    return results, (errors[0] if errors else None)
+
+
+async def _one_run(
+    client: AsyncAnthropic,
+    prompt: str,
+    run_num: int,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    on_text: Optional[Callable[[int, str], None]]
+) -> RunResult:
+    """
+    Make a single streamed API call and package it as a result dict.
+    
+    Returns:
+        RunResult: The result for this run (see run_business_case)
+    """
+    try:
+        # Call the Anthropic API
+        # Note: We use the Messages API (the modern approach), streamed so
+        # partial text can be shown while the run is still generating
+        async with client.messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        ) as stream:
+            # Only walk the text deltas when someone is listening;
+            # get_final_message drains the stream on its own otherwise
+            if on_text is not None:
+                async for text in stream.text_stream:
+                    on_text(run_num, text)
+            message = await stream.get_final_message()
+    except anthropic.APIError as e:
+        # Say which run failed, keeping the SDK error as the cause. (APIError
+        # itself can't be rebuilt from a message: it requires the request.)
+        raise RuntimeError(f"API call failed on run {run_num}: {e}") from e
+    
+    return _build_result(run_num, message)
+
+
+# Seconds between status checks while a message batch is processing
+BATCH_POLL_INTERVAL = 10.0
+
+
+async def _run_batch(
+    prompt: str,
+    api_key: str,
+    run_nums: List[int],
+    model: str,
+    temperature: float,
+    max_tokens: int
+) -> Tuple[List[RunResult], Optional[BaseException]]:
+    """
+    Submit the given runs as one Message Batch and wait for it to finish.
+    
+    Returns:
+        Tuple: (results of the runs that succeeded, in the order of run_nums;
+            an error for the first run that didn't, or None if all succeeded)
+    """
+    client = _get_async_client(api_key)
+    
+    batch = await client.messages.batches.create(
+        requests=[
+            {
+                "custom_id": f"run-{run_num}",
+                "params": {
+                    "model": model,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ]
+                }
+            }
+            for run_num in run_nums
+        ]
+    )
+    
+    # The batch is processed on Anthropic's side; poll until it has ended
+    try:
+        while batch.processing_status != "ended":
+            await asyncio.sleep(BATCH_POLL_INTERVAL)
+            batch = await client.messages.batches.retrieve(batch.id)
+    except asyncio.CancelledError:
+        # The caller gave up (see run_business_case). Cancelling only this
+        # task would leave the batch processing, and billed, on Anthropic's
+        # side, so cancel it there too (best-effort) before propagating.
+        try:
+            await client.messages.batches.cancel(batch.id)
+        except anthropic.APIError:
+            pass
+        raise
+    
+    # Results come back in no particular order, so match them up by custom_id
+    entries = {}
+    async for entry in await client.messages.batches.results(batch.id):
+        entries[entry.custom_id] = entry.result
     
     results = []
+    error = None
+    for run_num in run_nums:
+        result = entries[f"run-{run_num}"]
+        if result.type == "succeeded":
+            results.append(_build_result(run_num, result.message))
+        elif error is None:
+            error = RuntimeError(f"Batch request run-{run_num} did not succeed: {result.type}")
+    return results, error
+
+
+def _build_result(run_num: int, message: Any) -> RunResult:
+    """
+    Package an API response as a result dict (see run_business_case).
+    """
+    # Extract the text response
+    response_text = message.content[0].text
+    
+    # Store the result. The SDK message itself is not kept: nothing reads
+    # it, and results live in session state (and the on-disk cache) for as
+    # long as the session does.
+    return {
+        "run_number": run_num,
+        "response_text": response_text,
+        "metrics": extract_metrics(response_text)  # Parse metrics immediately
+    }
+
+
+# =============================================================================
+# RESULT CACHE
+# =============================================================================
+
+# Saved results, one pickle file per run (see run_business_case)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".validator_cache")
+
+
+def _cache_path(
+    prompt: str,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    run_num: int
+) -> str:
+    """
+    Return the cache file path for one run of a request.
+    
+    The file name is a hash of everything that affects the API response,
+    plus the run number. num_runs is deliberately left out so that runs
+    saved by a smaller request are reused by a larger one.
+    """
+    key = hashlib.sha256(
+        f"{model}|{temperature}|{max_tokens}|{run_num}|{prompt}".encode("utf-8")
+    ).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.pkl")
+
+
+def _load_cached_result(path: str) -> Optional[RunResult]:
+    """
+    Load a saved run result, or return None if there is none (or it can't be read).
+    """
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def _store_cached_result(path: str, result: RunResult) -> None:
+    """
+    Save a run result for later identical requests.
     
-    # Run the prompt multiple times
-    for run_num in range(1, num_runs + 1):
+    Writes to a temporary file first so a concurrent reader never sees a
+    partially written entry. Caching is best-effort: if the entry can't be
+    written (e.g. a read-only app directory), it is skipped rather than
+    failing a run whose API calls already succeeded.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except (OSError, pickle.PicklingError):
+        # Don't leave a partial temporary file behind
         try:
-            # Call the Anthropic API
-            # Note: We use the Messages API (the modern approach)
-            message = client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            
-            # Extract the text response
-            response_text = message.content[0].text
-            
-            # Store the result
-            result = {
-                "run_number": run_num,
-                "response_text": response_text,
-                "metrics": extract_metrics(response_text),  # Parse metrics immediately
-                "raw_response": message
-            }
-            
-            results.append(result)
-            
-        except anthropic.APIError as e:
-            # Handle API errors gracefully
-            raise anthropic.APIError(f"API call failed on run {run_num}: {str(e)}")
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def clear_cache() -> int:
+    """
+    Delete all saved results.
+    
+    Returns:
+        int: Number of cache entries removed
+    """
+    if not os.path.isdir(CACHE_DIR):
+        return 0
     
-    return results
+    removed = 0
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".pkl"):
+            os.remove(os.path.join(CACHE_DIR, name))
+            removed += 1
+    return removed
 
 
 # =============================================================================
 # METRIC EXTRACTION (PARSING)
 # =============================================================================
 
-def extract_metrics(ai_response: str) -> Dict[str, Any]:
+# Patterns are compiled once at import; extract_metrics runs on every response.
+# Dollar amounts, percentages and months share one alternation so a response
+# is scanned once; each group is named after the metrics key it fills.
+# Percentages and months must not start mid-number: a dollar match stops
+# before a one-digit decimal ("$12.5 months"), and the leftover "5" must not
+# be read as a metric of its own. Only a digit, or a decimal point right after
+# a digit, blocks a match, so values after a sentence-ending period still count.
+_METRIC_RE = re.compile(
+    r'(?P<dollar_amounts>\$[\d,]+(?:\.\d{2})?)'
+    r'|(?<!\d)(?<!\d\.)(?P<percentages>\d+(?:\.\d+)?)\s*%'
+    r'|(?<!\d)(?<!\d\.)(?P<months>\d+(?:\.\d+)?)\s*months?',
+    re.IGNORECASE
+)
+
+# Deletion table for dollar matches: strips "$" and thousands separators in a
+# single pass instead of chained str.replace calls
+_DOLLAR_STRIP = str.maketrans('', '', '$,')
+
+# Recommendation markers, matched case-insensitively against the original text
+# so no lowercased copy of the whole response is needed
+_REC_HEADER_RE = re.compile(r'recommendation:', re.IGNORECASE)
+# A whole sentence (text between periods) containing both "should" and
+# "proceed"; the lookbehind only lets a match start at a sentence boundary
+_SHOULD_PROCEED_RE = re.compile(
+    r'(?<![^.])[^.]*?(?:should[^.]*?proceed|proceed[^.]*?should)[^.]*',
+    re.IGNORECASE
+)
+
+# Recommendation keywords, one alternation per class (checked in this order)
+_DO_NOT_PROCEED_RE = re.compile(
+    r'do not proceed|not recommended|reconsider|advise against', re.IGNORECASE
+)
+_PROCEED_WITH_CAUTION_RE = re.compile(
+    r'proceed with caution|conditional|carefully consider', re.IGNORECASE
+)
+_PROCEED_RE = re.compile(
+    r'proceed|recommend|go ahead|move forward|approve', re.IGNORECASE
+)
+
+
+def extract_metrics(ai_response: str) -> Metrics:
     """
     Extract key metrics from an AI response using regex patterns.
     
@@ -123,7 +527,7 @@ def extract_metrics(ai_response: str) -> Dict[str, Any]:
         ai_response (str): The full text response from the AI
     
     Returns:
-        Dict[str, Any]: Dictionary containing extracted metrics:
+        Metrics: Dictionary containing extracted metrics:
             - dollar_amounts: List of all dollar values found
             - percentages: List of all percentage values found
             - months: List of all month values found
@@ -136,94 +540,98 @@ def extract_metrics(ai_response: str) -> Dict[str, Any]:
         >>> metrics['dollar_amounts']
         [1500000.0]
     """
+    dollar_amounts, percentages, months, recommendation, raw_text = (
+        _parse_metrics(ai_response)
+    )
+    
+    # The parse is memoized, so hand back fresh containers that callers are
+    # free to mutate without corrupting the cached entry
+    return {
+        "dollar_amounts": list(dollar_amounts),
+        "percentages": list(percentages),
+        "months": list(months),
+        "recommendation": recommendation,
+        "raw_recommendation_text": raw_text
+    }
+
+
+@lru_cache(maxsize=256)
+def _parse_metrics(
+    ai_response: str
+) -> Tuple[Tuple[float, ...], Tuple[float, ...], Tuple[float, ...], str, str]:
+    """
+    Parse an AI response into immutable metric values (see extract_metrics).
+    
+    Parsing is deterministic in the response text, and Streamlit reruns can
+    score the same responses many times, so results are memoized. Everything
+    returned is immutable so cached entries can be shared safely.
+    
+    Returns:
+        Tuple: (dollar_amounts, percentages, months, recommendation,
+            raw_recommendation_text)
+    """
     metrics = {
         "dollar_amounts": [],
         "percentages": [],
-        "months": [],
-        "recommendation": None,
-        "raw_recommendation_text": None
+        "months": []
     }
     
     # -------------------------------------------------------------------------
-    # EXTRACT DOLLAR AMOUNTS
+    # EXTRACT DOLLAR AMOUNTS, PERCENTAGES AND TIME PERIODS (MONTHS)
     # -------------------------------------------------------------------------
-    # Pattern: $1,234,567 or $1,234,567.89
-    # We'll find all matches and convert to float
-    dollar_pattern = r'\$[\d,]+(?:\.\d{2})?'
-    dollar_matches = re.findall(dollar_pattern, ai_response)
-    
-    for match in dollar_matches:
-        # Remove $ and commas, then convert to float
-        clean_value = match.replace('$', '').replace(',', '')
+    # Patterns (single pass, see _METRIC_RE):
+    # - Dollar amounts: $1,234,567 or $1,234,567.89
+    # - Percentages: 45.2% or 100%
+    # - Months: "12.5 months" or "6 months"
+    # We'll find all matches and convert to float. The bound append methods
+    # are looked up once here rather than once per match.
+    appenders = {key: values.append for key, values in metrics.items()}
+    for match in _METRIC_RE.finditer(ai_response):
+        key = match.lastgroup
+        value = match.group(key)
+        if key == "dollar_amounts":
+            # Remove $ and commas
+            value = value.translate(_DOLLAR_STRIP)
         try:
-            metrics["dollar_amounts"].append(float(clean_value))
+            appenders[key](float(value))
         except ValueError:
             # Skip if conversion fails
             continue
     
-    # -------------------------------------------------------------------------
-    # EXTRACT PERCENTAGES
-    # -------------------------------------------------------------------------
-    # Pattern: 45.2% or 100%
-    # Look for numbers followed by % sign
-    percentage_pattern = r'(\d+(?:\.\d+)?)\s*%'
-    percentage_matches = re.findall(percentage_pattern, ai_response)
-    
-    for match in percentage_matches:
-        try:
-            metrics["percentages"].append(float(match))
-        except ValueError:
-            continue
-    
-    # -------------------------------------------------------------------------
-    # EXTRACT TIME PERIODS (MONTHS)
-    # -------------------------------------------------------------------------
-    # Pattern: "12.5 months" or "6 months"
-    # Look for numbers followed by "month" or "months"
-    months_pattern = r'(\d+(?:\.\d+)?)\s*months?'
-    months_matches = re.findall(months_pattern, ai_response, re.IGNORECASE)
-    
-    for match in months_matches:
-        try:
-            metrics["months"].append(float(match))
-        except ValueError:
-            continue
-    
     # -------------------------------------------------------------------------
     # EXTRACT RECOMMENDATION
     # -------------------------------------------------------------------------
     # Look for recommendation keywords in the text
     # We'll classify as: PROCEED, PROCEED_WITH_CAUTION, or DO_NOT_PROCEED
     
-    response_lower = ai_response.lower()
-    
     # Try to find the recommendation section (usually at the end)
     recommendation_section = ""
-    if "recommendation:" in response_lower:
-        recommendation_section = ai_response[response_lower.index("recommendation:"):]
-    elif "should" in response_lower and "proceed" in response_lower:
-        # Look for sentences with "should" and "proceed"
-        sentences = ai_response.split('.')
-        for sentence in sentences:
-            if "should" in sentence.lower() and "proceed" in sentence.lower():
-                recommendation_section = sentence
-                break
-    
-    metrics["raw_recommendation_text"] = recommendation_section.strip()
+    header_match = _REC_HEADER_RE.search(ai_response)
+    if header_match:
+        recommendation_section = ai_response[header_match.start():]
+    else:
+        # Look for the first sentence with "should" and "proceed"
+        sentence_match = _SHOULD_PROCEED_RE.search(ai_response)
+        if sentence_match:
+            recommendation_section = sentence_match.group()
     
     # Classify the recommendation
-    rec_lower = recommendation_section.lower()
-    
-    if any(keyword in rec_lower for keyword in ["do not proceed", "not recommended", "reconsider", "advise against"]):
-        metrics["recommendation"] = "DO_NOT_PROCEED"
-    elif any(keyword in rec_lower for keyword in ["proceed with caution", "conditional", "carefully consider"]):
-        metrics["recommendation"] = "PROCEED_WITH_CAUTION"
-    elif any(keyword in rec_lower for keyword in ["proceed", "recommend", "go ahead", "move forward", "approve"]):
-        metrics["recommendation"] = "PROCEED"
+    if _DO_NOT_PROCEED_RE.search(recommendation_section):
+        recommendation = "DO_NOT_PROCEED"
+    elif _PROCEED_WITH_CAUTION_RE.search(recommendation_section):
+        recommendation = "PROCEED_WITH_CAUTION"
+    elif _PROCEED_RE.search(recommendation_section):
+        recommendation = "PROCEED"
     else:
-        metrics["recommendation"] = "UNCLEAR"
-    
-    return metrics
+        recommendation = "UNCLEAR"
+    
+    return (
+        tuple(metrics["dollar_amounts"]),
+        tuple(metrics["percentages"]),
+        tuple(metrics["months"]),
+        recommendation,
+        recommendation_section.strip()
+    )
 
 
 def extract_specific_metric(
@@ -271,7 +679,46 @@ def extract_specific_metric(
 # CONSISTENCY ANALYSIS
 # =============================================================================
 
-def calculate_consistency_score(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+# Numeric metrics compared across runs, in report order:
+# (metrics key, metric score name prefix, finding label,
+#  number of values to compare, variance % above which a finding is added)
+_NUMERIC_METRICS = (
+    ("dollar_amounts", "dollar_amount", "Dollar amount", 5, 2.0),
+    ("percentages", "percentage", "Percentage", 3, 5.0),
+    ("months", "months", "Time period", 2, 10.0),
+)
+
+# Variance buckets for numeric metrics: a variance below 2% scores 20, below
+# 5% scores 15, below 10% scores 10 and anything higher scores 0.
+# bisect_right keeps the boundaries exclusive (exactly 2.0% scores 15).
+_VARIANCE_THRESHOLDS = (2.0, 5.0, 10.0)
+_VARIANCE_SCORES = (20, 15, 10, 0)
+
+# Finding added when a numeric metric varies more than its threshold, filled
+# with (finding label, value position, variance %)
+_VARIANCE_FINDING = "⚠️ {} #{} varies by {:.1f}% across runs".format
+
+# Status levels by overall score: (status, emoji, color) for scores below 70,
+# from 70, from 85 and from 95
+_STATUS_THRESHOLDS = (70, 85, 95)
+_STATUS_LEVELS = (
+    ("NOT_READY", "❌", "red"),
+    ("NEEDS_PROMPT_ENGINEERING", "🔧", "orange"),
+    ("NEEDS_TUNING", "⚠️", "yellow"),
+    ("PRODUCTION_READY", "✅", "green"),
+)
+
+# Improvement recommendations, in report order: each applies when the overall
+# score is below its threshold
+_SCORE_RECOMMENDATIONS = (
+    (95, "1. Add structured JSON output format to your prompt for more consistent parsing"),
+    (85, "2. Reduce temperature to 0.0 for more deterministic outputs"),
+    (70, "3. Add explicit calculation validation steps in the prompt"),
+    (70, "4. Consider breaking complex analysis into smaller, focused prompts"),
+)
+
+
+def calculate_consistency_score(results: List[RunResult]) -> Dict[str, Any]:
     """
     Calculate a consistency score by comparing metrics across multiple runs.
     
@@ -292,7 +739,7 @@ def calculate_consistency_score(results: List[Dict[str, Any]]) -> Dict[str, Any]
         - All different: +0 points
     
     Args:
-        results (List[Dict]): List of results from run_business_case()
+        results (List[RunResult]): List of results from run_business_case()
     
     Returns:
         Dict containing:
@@ -310,162 +757,106 @@ def calculate_consistency_score(results: List[Dict[str, Any]]) -> Dict[str, Any]
         >>> print(f"Score: {score_data['total_score']}/100")
         Score: 87/100
     """
-    # Initialize scoring structure
-    scoring = {
-        "total_score": 0,
-        "max_possible_score": 0,
-        "metric_scores": {},
-        "variances": {},
-        "findings": [],
-        "recommendations": []
-    }
+    # Scores are accumulated in locals and assembled into the result dict once
+    # at the end, rather than written through nested dict keys as we go
+    total_score = 0
+    max_possible_score = 0
+    metric_scores = {}
+    variances = {}
+    findings = []
     
     # Extract all metrics from results
-    all_metrics = [result["metrics"] for result in results]
+    all_metrics = list(map(itemgetter("metrics"), results))
     
     # -------------------------------------------------------------------------
-    # ANALYZE DOLLAR AMOUNTS
+    # ANALYZE NUMERIC METRICS (DOLLAR AMOUNTS, PERCENTAGES, TIME PERIODS)
     # -------------------------------------------------------------------------
-    # Compare the first few dollar amounts across runs (usually the key costs)
-    # We'll check up to 5 dollar amounts
-    for i in range(5):
-        values = []
-        for metrics in all_metrics:
-            if i < len(metrics["dollar_amounts"]):
-                values.append(metrics["dollar_amounts"][i])
+    # Compare the first few values of each metric across runs (usually the key
+    # costs, ROI and payback period). See _NUMERIC_METRICS for the limits.
+    for key, name_prefix, label, max_values, finding_threshold in _NUMERIC_METRICS:
+        # Transpose runs x values into one column per value position. Runs
+        # with fewer values are padded with None, which is dropped again, so
+        # each position is compared across every run that reported it.
+        get_values = itemgetter(key)
+        value_lists = [get_values(metrics)[:max_values] for metrics in all_metrics]
         
-        if len(values) >= 2:  # Need at least 2 values to compare
-            score, variance = _score_numeric_metric(values)
-            metric_name = f"dollar_amount_{i+1}"
-            scoring["metric_scores"][metric_name] = score
-            scoring["variances"][metric_name] = variance
-            scoring["total_score"] += score
-            scoring["max_possible_score"] += 25
-            
-            # Add findings if there's significant variance
-            if variance > 2.0:
-                scoring["findings"].append(
-                    f"⚠️ Dollar amount #{i+1} varies by {variance:.1f}% across runs"
-                )
-    
-    # -------------------------------------------------------------------------
-    # ANALYZE PERCENTAGES
-    # -------------------------------------------------------------------------
-    for i in range(3):  # Check up to 3 percentages
-        values = []
-        for metrics in all_metrics:
-            if i < len(metrics["percentages"]):
-                values.append(metrics["percentages"][i])
+        # Need at least 2 values to compare, so only positions within the
+        # second-longest list are scored. (Stopping at the shortest list would
+        # skip positions that some, but not all, runs reported.)
+        lengths = sorted(map(len, value_lists))
+        comparable = lengths[-2] if len(lengths) >= 2 else 0
         
-        if len(values) >= 2:
-            score, variance = _score_numeric_metric(values)
-            metric_name = f"percentage_{i+1}"
-            scoring["metric_scores"][metric_name] = score
-            scoring["variances"][metric_name] = variance
-            scoring["total_score"] += score
-            scoring["max_possible_score"] += 25
+        columns = islice(zip_longest(*value_lists), comparable)
+        for i, column in enumerate(columns):
+            values = [value for value in column if value is not None]
             
-            if variance > 5.0:
-                scoring["findings"].append(
-                    f"⚠️ Percentage #{i+1} varies by {variance:.1f}% across runs"
-                )
-    
-    # -------------------------------------------------------------------------
-    # ANALYZE TIME PERIODS (MONTHS)
-    # -------------------------------------------------------------------------
-    for i in range(2):  # Check up to 2 time periods
-        values = []
-        for metrics in all_metrics:
-            if i < len(metrics["months"]):
-                values.append(metrics["months"][i])
-        
-        if len(values) >= 2:
             score, variance = _score_numeric_metric(values)
-            metric_name = f"months_{i+1}"
-            scoring["metric_scores"][metric_name] = score
-            scoring["variances"][metric_name] = variance
-            scoring["total_score"] += score
-            scoring["max_possible_score"] += 25
+            metric_name = f"{name_prefix}_{i+1}"
+            metric_scores[metric_name] = score
+            variances[metric_name] = variance
+            total_score += score
+            max_possible_score += 25
             
-            if variance > 10.0:
-                scoring["findings"].append(
-                    f"⚠️ Time period #{i+1} varies by {variance:.1f}% across runs"
-                )
+            # Add findings if there's significant variance
+            if variance > finding_threshold:
+                findings.append(_VARIANCE_FINDING(label, i + 1, variance))
     
     # -------------------------------------------------------------------------
     # ANALYZE RECOMMENDATIONS
     # -------------------------------------------------------------------------
-    recommendations = [metrics["recommendation"] for metrics in all_metrics]
-    rec_score = _score_recommendation(recommendations)
-    scoring["metric_scores"]["recommendation"] = rec_score
-    scoring["total_score"] += rec_score
-    scoring["max_possible_score"] += 25
+    run_recommendations = [metrics["recommendation"] for metrics in all_metrics]
+    rec_score = _score_recommendation(run_recommendations)
+    metric_scores["recommendation"] = rec_score
+    total_score += rec_score
+    max_possible_score += 25
     
     if rec_score == 25:
-        scoring["findings"].append("✅ Final recommendation is consistent across all runs")
+        findings.append("✅ Final recommendation is consistent across all runs")
     elif rec_score == 15:
-        scoring["findings"].append("⚠️ Recommendation varies - 2 out of 3 runs agree")
+        findings.append("⚠️ Recommendation varies - 2 out of 3 runs agree")
     else:
-        scoring["findings"].append("❌ Recommendations are inconsistent across runs")
+        findings.append("❌ Recommendations are inconsistent across runs")
     
     # -------------------------------------------------------------------------
     # CALCULATE FINAL SCORE (NORMALIZED TO 100)
     # -------------------------------------------------------------------------
-    if scoring["max_possible_score"] > 0:
-        scoring["total_score"] = int(
-            (scoring["total_score"] / scoring["max_possible_score"]) * 100
-        )
+    if max_possible_score > 0:
+        score = int((total_score / max_possible_score) * 100)
     else:
-        scoring["total_score"] = 0
+        score = 0
     
     # -------------------------------------------------------------------------
     # DETERMINE STATUS
     # -------------------------------------------------------------------------
-    score = scoring["total_score"]
-    if score >= 95:
-        scoring["status"] = "PRODUCTION_READY"
-        scoring["status_emoji"] = "✅"
-        scoring["status_color"] = "green"
-    elif score >= 85:
-        scoring["status"] = "NEEDS_TUNING"
-        scoring["status_emoji"] = "⚠️"
-        scoring["status_color"] = "yellow"
-    elif score >= 70:
-        scoring["status"] = "NEEDS_PROMPT_ENGINEERING"
-        scoring["status_emoji"] = "🔧"
-        scoring["status_color"] = "orange"
-    else:
-        scoring["status"] = "NOT_READY"
-        scoring["status_emoji"] = "❌"
-        scoring["status_color"] = "red"
+    status, status_emoji, status_color = _STATUS_LEVELS[
+        bisect.bisect_right(_STATUS_THRESHOLDS, score)
+    ]
     
     # -------------------------------------------------------------------------
     # GENERATE RECOMMENDATIONS
     # -------------------------------------------------------------------------
-    if score < 95:
-        scoring["recommendations"].append(
-            "1. Add structured JSON output format to your prompt for more consistent parsing"
-        )
-    
-    if score < 85:
-        scoring["recommendations"].append(
-            "2. Reduce temperature to 0.0 for more deterministic outputs"
-        )
-    
-    if score < 70:
-        scoring["recommendations"].append(
-            "3. Add explicit calculation validation steps in the prompt"
-        )
-        scoring["recommendations"].append(
-            "4. Consider breaking complex analysis into smaller, focused prompts"
-        )
+    # Score-based advice comes from _SCORE_RECOMMENDATIONS; the last one
+    # depends on the recommendation score instead
+    recommendations = [
+        text for threshold, text in _SCORE_RECOMMENDATIONS if score < threshold
+    ]
     
     if rec_score < 25:
-        scoring["recommendations"].append(
+        recommendations.append(
             "5. Provide clearer decision criteria for recommendations in the prompt"
         )
     
-    return scoring
+    return {
+        "total_score": score,
+        "max_possible_score": max_possible_score,
+        "metric_scores": metric_scores,
+        "variances": variances,
+        "findings": findings,
+        "recommendations": recommendations,
+        "status": status,
+        "status_emoji": status_emoji,
+        "status_color": status_color
+    }
 
 
 def _score_numeric_metric(values: List[float]) -> Tuple[int, float]:
@@ -481,28 +872,29 @@ def _score_numeric_metric(values: List[float]) -> Tuple[int, float]:
     if not values or len(values) < 2:
         return 0, 0.0
     
+    # The extremes are all the deviation check needs: min/max/fsum each make
+    # one pass in C, with no per-value Python work
+    lo = min(values)
+    hi = max(values)
+    
     # Check if all values are identical
-    if len(set(values)) == 1:
+    if lo == hi:
         return 25, 0.0
     
-    # Calculate variance as percentage
-    avg = mean(values)
+    # Calculate variance as percentage. fsum keeps the sum exactly rounded
+    # without statistics.mean's Fraction-based type juggling.
+    avg = fsum(values) / len(values)
     if avg == 0:
         return 0, 100.0
     
-    # Calculate percentage difference from mean
-    variances = [abs(v - avg) / avg * 100 for v in values]
-    max_variance = max(variances)
-    
-    # Score based on variance
-    if max_variance < 2.0:
-        score = 20
-    elif max_variance < 5.0:
-        score = 15
-    elif max_variance < 10.0:
-        score = 10
-    else:
-        score = 0
+    # Largest percentage difference from mean. The value furthest from the
+    # mean is always the min or the max, so this equals max(|v - avg|).
+    # Extracted values are never negative, so avg > 0 and scaling the largest
+    # deviation is the same as taking the largest scaled one.
+    max_variance = max(hi - avg, avg - lo) / avg * 100
+    
+    # Score based on variance (see _VARIANCE_THRESHOLDS)
+    score = _VARIANCE_SCORES[bisect.bisect_right(_VARIANCE_THRESHOLDS, max_variance)]
     
     return score, max_variance
 
@@ -520,6 +912,18 @@ def _score_recommendation(recommendations: List[str]) -> int:
     if not recommendations:
         return 0
     
+    # Three runs is the usual case: compare directly instead of building a set
+    if len(recommendations) == 3:
+        first, second, third = recommendations
+        if first == second == third:
+            # All match
+            return 25
+        if first == second or second == third or first == third:
+            # 2 of 3 match
+            return 15
+        # All different
+        return 0
+    
     # Count occurrences
     unique_recs = set(recommendations)
     
@@ -538,7 +942,13 @@ def _score_recommendation(recommendations: List[str]) -> int:
 # COMPARISON TABLE GENERATION
 # =============================================================================
 
-def generate_comparison_table(results: List[Dict[str, Any]]) -> pd.DataFrame:
+# Cell formatters, bound once so each column is formatted with a single map()
+_FORMAT_DOLLARS = "${:,.2f}".format
+_FORMAT_PERCENTAGE = "{:.1f}%".format
+_FORMAT_MONTHS = "{:.1f} months".format
+
+
+def generate_comparison_table(results: List[RunResult]) -> pd.DataFrame:
     """
     Generate a pandas DataFrame comparing metrics across runs.
     
@@ -546,11 +956,14 @@ def generate_comparison_table(results: List[Dict[str, Any]]) -> pd.DataFrame:
     in Streamlit or export to CSV.
     
     Args:
-        results (List[Dict]): List of results from run_business_case()
+        results (List[RunResult]): List of results from run_business_case()
     
     Returns:
         pd.DataFrame: Comparison table with metrics as rows and runs as columns
     
+    Raises:
+        ValueError: If results is empty
+    
     Example:
         >>> df = generate_comparison_table(results)
         >>> print(df)
@@ -559,67 +972,53 @@ def generate_comparison_table(results: List[Dict[str, Any]]) -> pd.DataFrame:
         Dollar Amount 2   $3,100,000   $3,100,000   $3,050,000
         ...
     """
-    # Prepare data structure
-    comparison_data = {}
-    
-    # Extract metrics from each run
+    # Row counts per metric type: the run with the most values sets the height.
+    # One pass over the runs finds all three.
+    if not results:
+        raise ValueError("results must contain at least one run")
+    max_dollars = max_percentages = max_months = 0
     for result in results:
-        run_num = result["run_number"]
         metrics = result["metrics"]
-        
-        col_name = f"Run #{run_num}"
-        comparison_data[col_name] = []
-    
-    # Build rows for dollar amounts
-    max_dollars = max(len(r["metrics"]["dollar_amounts"]) for r in results)
-    row_labels = []
-    
-    for i in range(max_dollars):
-        row_labels.append(f"Dollar Amount {i+1}")
-        for result in results:
-            col_name = f"Run #{result['run_number']}"
-            metrics = result["metrics"]
-            if i < len(metrics["dollar_amounts"]):
-                value = metrics["dollar_amounts"][i]
-                comparison_data[col_name].append(f"${value:,.2f}")
-            else:
-                comparison_data[col_name].append("N/A")
-    
-    # Build rows for percentages
-    max_percentages = max(len(r["metrics"]["percentages"]) for r in results)
-    for i in range(max_percentages):
-        row_labels.append(f"Percentage {i+1}")
-        for result in results:
-            col_name = f"Run #{result['run_number']}"
-            metrics = result["metrics"]
-            if i < len(metrics["percentages"]):
-                value = metrics["percentages"][i]
-                comparison_data[col_name].append(f"{value:.1f}%")
-            else:
-                comparison_data[col_name].append("N/A")
-    
-    # Build rows for months
-    max_months = max(len(r["metrics"]["months"]) for r in results)
-    for i in range(max_months):
-        row_labels.append(f"Time Period {i+1}")
-        for result in results:
-            col_name = f"Run #{result['run_number']}"
-            metrics = result["metrics"]
-            if i < len(metrics["months"]):
-                value = metrics["months"][i]
-                comparison_data[col_name].append(f"{value:.1f} months")
-            else:
-                comparison_data[col_name].append("N/A")
-    
-    # Build row for recommendation
-    row_labels.append("Recommendation")
+        max_dollars = max(max_dollars, len(metrics["dollar_amounts"]))
+        max_percentages = max(max_percentages, len(metrics["percentages"]))
+        max_months = max(max_months, len(metrics["months"]))
+    
+    # Row labels: dollar amounts, then percentages, then months, then the
+    # recommendation
+    row_labels = (
+        [f"Dollar Amount {i+1}" for i in range(max_dollars)]
+        + [f"Percentage {i+1}" for i in range(max_percentages)]
+        + [f"Time Period {i+1}" for i in range(max_months)]
+        + ["Recommendation"]
+    )
+    
+    # Build each run's column in one go, padding short metric lists with "N/A"
+    # so every column lines up with row_labels
+    comparison_data = {}
     for result in results:
-        col_name = f"Run #{result['run_number']}"
         metrics = result["metrics"]
-        comparison_data[col_name].append(metrics["recommendation"])
+        dollars = metrics["dollar_amounts"]
+        percentages = metrics["percentages"]
+        months = metrics["months"]
+        
+        comparison_data[f"Run #{result['run_number']}"] = (
+            list(map(_FORMAT_DOLLARS, dollars))
+            + ["N/A"] * (max_dollars - len(dollars))
+            + list(map(_FORMAT_PERCENTAGE, percentages))
+            + ["N/A"] * (max_percentages - len(percentages))
+            + list(map(_FORMAT_MONTHS, months))
+            + ["N/A"] * (max_months - len(months))
+            + [metrics["recommendation"]]
+        )
     
-    # Create DataFrame
-    df = pd.DataFrame(comparison_data, index=row_labels)
+    # Create DataFrame from one 2D object array (rows x runs), so pandas gets
+    # a single block up front instead of assembling it from a dict column by
+    # column
+    df = pd.DataFrame(
+        np.array(list(comparison_data.values()), dtype=object).T,
+        index=row_labels,
+        columns=list(comparison_data)
+    )
     
     return df
 